@@ -1,56 +1,204 @@
 import os
 import time
 import json
+import mmap
+import heapq
 import shutil
 import hashlib
 import logging
+import functools
+import zipfile
+import threading
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import ThreadPoolExecutor
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+# Duplicate detection has no adversarial model, so prefer the fastest hash
+# available: xxHash3-128 (~5 GB/s), then BLAKE3 (SIMD tree hashing), then
+# SHA-256 as the stdlib fallback. A positive hash match is confirmed with a
+# full byte comparison before anything is deleted, so a weaker hash costs
+# nothing in correctness.
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+HASH_ALGO = "xxh3_128" if xxhash is not None else ("blake3" if blake3 is not None else "sha256")
+
 # Configuration
 CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
 LOG_FILE = os.path.expanduser("~/Library/Logs/mac-organizer.log")
+HASH_CACHE_FILE = os.path.expanduser("~/Library/Caches/mac-organizer/hashes.json")
+
+# Setup logging: handler threads only enqueue records; a background listener
+# does the actual file writes, so hot paths never block on log I/O
+_log_queue = queue.Queue(-1)
+_log_file_handler = logging.FileHandler(LOG_FILE)
+_log_file_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+_log_listener = QueueListener(_log_queue, _log_file_handler)
+logging.getLogger().setLevel(logging.INFO)
+logging.getLogger().addHandler(QueueHandler(_log_queue))
+_log_listener.start()
+
+# In-progress download extensions to leave alone; str.endswith takes the
+# whole tuple in one C-level call
+_IGNORE_SUFFIXES = ('.download', '.crdownload', '.part', '.tmp', '.partial', '.!ut')
 
-# Setup logging
-logging.basicConfig(filename=LOG_FILE, level=logging.INFO,
-                    format='%(asctime)s - %(message)s')
+# Formats that are already compressed: DEFLATE barely shrinks them, so
+# store them as-is in archives instead of burning CPU on re-compression
+ALREADY_COMPRESSED_EXTS = {
+    "jpg", "jpeg", "png", "gif", "webp",
+    "mp3", "aac", "m4a", "ogg", "flac",
+    "mp4", "mov", "avi", "mkv", "flv", "wmv", "webm",
+    "zip", "rar", "7z", "gz", "pkg", "dmg",
+    "pdf", "docx", "xlsx", "pptx",
+}
+
+# Config keys that hold settings rather than category -> extensions lists
+NON_CATEGORY_KEYS = {"target_directories", "target_directory", "archive", "keep_duplicate_link"}
 
 def load_config():
     with open(CONFIG_FILE, 'r') as f:
         return json.load(f)
 
-def get_category(extension, config):
-    for category, extensions in config.items():
-        if extension.lower() in extensions:
-            return category
-    return "Others"
+def build_extension_map(config):
+    """Invert the config's category -> [extensions] lists into one flat dict."""
+    return {ext.lower(): category
+            for category, extensions in config.items()
+            if category not in NON_CATEGORY_KEYS and isinstance(extensions, list)
+            for ext in extensions}
+
+def get_category(extension, ext_to_category):
+    return ext_to_category.get(extension.lower(), "Others")
 
 def calculate_hash(filepath):
-    """Calculate SHA256 hash of a file."""
+    """Calculate content hash of a file (xxHash3-128, BLAKE3 or SHA256)."""
+    if xxhash is not None:
+        h = xxhash.xxh3_128()
+        with open(filepath, "rb") as f:
+            for byte_block in iter(lambda: f.read(1 << 20), b""):
+                h.update(byte_block)
+        return h.hexdigest()
+    if blake3 is not None:
+        hasher = blake3.blake3()
+        hasher.update_mmap(filepath)
+        return hasher.hexdigest()
     sha256_hash = hashlib.sha256()
     with open(filepath, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
+        # 1 MiB blocks: 4 KiB reads meant one syscall per 4 KiB and a
+        # Python-level loop iteration to match
+        for byte_block in iter(lambda: f.read(1 << 20), b""):
             sha256_hash.update(byte_block)
     return sha256_hash.hexdigest()
 
-def is_duplicate(source_path, dest_path):
-    """Check if source_path is a duplicate of dest_path."""
+def quick_fingerprint(filepath, size=None):
+    """Cheap first-pass fingerprint: hash of the first and last 64 KiB.
+
+    Reads at most 128 KiB regardless of file size, so multi-GiB candidates
+    are pre-filtered without a full-file read. Only fingerprint matches
+    escalate to the full content hash.
+    """
+    if size is None:
+        size = os.path.getsize(filepath)
+    with open(filepath, 'rb') as f:
+        head = f.read(65536)
+        if size > 65536:
+            f.seek(max(65536, size - 65536))
+            tail = f.read(65536)
+        else:
+            tail = b""
+    return hashlib.blake2b(head + tail, digest_size=16).hexdigest()
+
+
+def walk_fast(top):
+    """Recursive scandir walk yielding (root, [DirEntry]) pairs.
+
+    Unlike os.walk this prunes hidden directories before descending into
+    them, skips hidden files, and hands back DirEntry objects so callers
+    read mtime/size off the cached stat instead of re-statting paths.
+    """
+    dirs, files = [], []
+    try:
+        with os.scandir(top) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    files.append(entry)
+    except OSError as e:
+        logging.error(f"Failed to scan {top}: {e}")
+        return
+    yield top, files
+    for d in dirs:
+        yield from walk_fast(d)
+
+
+def files_equal(path_a, path_b):
+    """Byte-for-byte comparison via mmap.
+
+    Mapping both files and comparing the slices boils down to a single C
+    memcmp over the page cache -- no hashing, and for cached files no disk
+    reads at all.
+    """
+    size_a = os.path.getsize(path_a)
+    if size_a != os.path.getsize(path_b):
+        return False
+    if size_a == 0:
+        return True  # mmap cannot map empty files; two empty files are equal
+    with open(path_a, 'rb') as fa, open(path_b, 'rb') as fb:
+        mm_a = mmap.mmap(fa.fileno(), 0, access=mmap.ACCESS_READ)
+        mm_b = mmap.mmap(fb.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return mm_a[:] == mm_b[:]
+        finally:
+            mm_a.close()
+            mm_b.close()
+
+
+def is_duplicate(source_path, dest_path, source_size=None, source_hash=None):
+    """Check if source_path is a duplicate of dest_path.
+
+    Callers comparing one source against many candidates should pass the
+    precomputed source_size/source_hash so the source file is read once,
+    not once per candidate.
+    """
     if not os.path.exists(dest_path):
         return False
-    
+
+    # Same inode on the same device means the same file (hardlink/clone):
+    # trivially a duplicate, no reads needed
+    source_stat = os.stat(source_path)
+    dest_stat = os.stat(dest_path)
+    if source_stat.st_dev == dest_stat.st_dev and source_stat.st_ino == dest_stat.st_ino:
+        return True
+
     # Check size first
-    if os.path.getsize(source_path) != os.path.getsize(dest_path):
+    if source_size is None:
+        source_size = source_stat.st_size
+    if source_size != dest_stat.st_size:
         return False
-    
-    # Check hash
-    return calculate_hash(source_path) == calculate_hash(dest_path)
+
+    # Check content: with a precomputed source hash only the dest needs
+    # hashing; otherwise a single memcmp beats hashing both files
+    if source_hash is not None:
+        return source_hash == calculate_hash(dest_path)
+    return files_equal(source_path, dest_path)
 
 def get_unique_filename(dest_folder, filename):
     """Generate a unique filename if the file already exists."""
     name, ext = os.path.splitext(filename)
     counter = 1
     new_filename = filename
-    while os.path.exists(os.path.join(dest_folder, new_filename)):
+    _exists, _join = os.path.exists, os.path.join  # avoid per-iteration attribute lookups
+    while _exists(_join(dest_folder, new_filename)):
         new_filename = f"{name} ({counter}){ext}"
         counter += 1
     return new_filename
@@ -59,14 +207,140 @@ class OrganizerHandler(FileSystemEventHandler):
     def __init__(self, config, target_directories):
         self.config = config
         self.target_directories = target_directories
+        # Precomputed extension -> category map: one dict lookup per event
+        # instead of a linear scan over every category list. The map is built
+        # once and never mutated, so the lookup (including the .lower()
+        # normalization) can be memoized for the lifetime of the process.
+        self.ext_to_category = build_extension_map(config)
+        self.category_for = functools.lru_cache(maxsize=4096)(
+            lambda extension: self.ext_to_category.get(extension.lower(), "Others"))
+        # path -> (size, mtime_ns, digest): avoids rehashing unchanged destination files
+        self.hash_cache = {}
+        self.load_hash_cache()
+        # path -> (size, mtime_ns, fingerprint): in-memory only, cheap to rebuild
+        self.fingerprint_cache = {}
+        # dest_folder -> size -> [paths]: lets the common "no size match" case
+        # skip hashing entirely
+        self.size_index = {}
+        # dest_folder -> Lock: serializes duplicate-check + move per folder so
+        # concurrent workers can't race on renames or the size index
+        self.folder_locks = {}
+        self._folder_locks_guard = threading.Lock()
+        # Min-heap of (archive deadline, path), fed on every move when
+        # archival is enabled; archive_threshold stays None otherwise
+        self.archive_threshold = None
+        self.archive_heap = []
+        self.archive_heap_lock = threading.Lock()
+        # Event coalescing: watchdog callbacks only record path -> timestamp
+        # here, and the dispatcher thread debounces and processes. Browsers
+        # and editors fire several events per logical file (temp-file rename
+        # dances); they collapse to one entry, and the observer thread never
+        # blocks on our per-file work.
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+        dispatcher = threading.Thread(target=self.dispatch_pending, daemon=True)
+        dispatcher.start()
+
+    def enqueue(self, filepath):
+        with self.pending_lock:
+            self.pending[filepath] = time.time()
+
+    def dispatch_pending(self):
+        """Process pending paths once they have been quiet for 0.5 s."""
+        while True:
+            time.sleep(0.2)
+            now = time.time()
+            with self.pending_lock:
+                due = [path for path, seen in self.pending.items() if (now - seen) > 0.5]
+                for path in due:
+                    del self.pending[path]
+            for path in due:
+                # The debounce already absorbed the event burst; the
+                # size-stability poll in process_file is not needed on top
+                self.process_file(path, wait_for_write=False)
+
+    def schedule_archival(self, filepath, mtime=None):
+        if self.archive_threshold is None:
+            return
+        deadline = (mtime if mtime is not None else time.time()) + self.archive_threshold
+        with self.archive_heap_lock:
+            heapq.heappush(self.archive_heap, (deadline, filepath))
+
+    def get_folder_lock(self, dest_folder):
+        with self._folder_locks_guard:
+            lock = self.folder_locks.get(dest_folder)
+            if lock is None:
+                lock = self.folder_locks[dest_folder] = threading.Lock()
+            return lock
+
+    def get_size_index(self, dest_folder):
+        """Return (building lazily) the size -> [paths] map for dest_folder."""
+        index = self.size_index.get(dest_folder)
+        if index is None:
+            index = {}
+            with os.scandir(dest_folder) as entries:
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False):
+                        index.setdefault(entry.stat(follow_symlinks=False).st_size, []).append(entry.path)
+            self.size_index[dest_folder] = index
+        return index
+
+    def load_hash_cache(self):
+        try:
+            with open(HASH_CACHE_FILE, 'r') as f:
+                data = json.load(f)
+            # Digests from a different hash algorithm are useless; start fresh
+            if data.get("algo") != HASH_ALGO:
+                self.hash_cache = {}
+                return
+            self.hash_cache = {path: tuple(entry) for path, entry in data.get("entries", {}).items()}
+        except (OSError, ValueError, AttributeError):
+            self.hash_cache = {}
+
+    def save_hash_cache(self):
+        try:
+            os.makedirs(os.path.dirname(HASH_CACHE_FILE), exist_ok=True)
+            with open(HASH_CACHE_FILE, 'w') as f:
+                json.dump({"algo": HASH_ALGO,
+                           "entries": {path: list(entry) for path, entry in self.hash_cache.items()}}, f)
+        except OSError as e:
+            logging.warning(f"Could not save hash cache: {e}")
+
+    def get_cached_hash(self, filepath, st=None):
+        """Return the content hash of filepath, reusing the cache if the file is unchanged."""
+        if st is None:
+            st = os.stat(filepath)
+        cached = self.hash_cache.get(filepath)
+        if cached is not None and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        digest = calculate_hash(filepath)
+        self.hash_cache[filepath] = (st.st_size, st.st_mtime_ns, digest)
+        return digest
+
+    def get_cached_fingerprint(self, filepath, st):
+        """Like get_cached_hash, but for the 128 KiB quick fingerprint."""
+        cached = self.fingerprint_cache.get(filepath)
+        if cached is not None and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        fingerprint = quick_fingerprint(filepath, st.st_size)
+        self.fingerprint_cache[filepath] = (st.st_size, st.st_mtime_ns, fingerprint)
+        return fingerprint
 
     def on_created(self, event):
         if not event.is_directory:
-            self.process_file(event.src_path)
+            self.enqueue(event.src_path)
+
+    def on_modified(self, event):
+        # Refreshing the timestamp keeps in-progress downloads debounced
+        # until their writes go quiet
+        if not event.is_directory:
+            with self.pending_lock:
+                if event.src_path in self.pending:
+                    self.pending[event.src_path] = time.time()
 
     def on_moved(self, event):
         if not event.is_directory:
-            self.process_file(event.dest_path)
+            self.enqueue(event.dest_path)
 
     def process_file(self, filepath, wait_for_write=True):
         # Only process files directly in one of the Target folders
@@ -77,12 +351,27 @@ class OrganizerHandler(FileSystemEventHandler):
 
         # Ignore hidden files and temporary download files
         filename = os.path.basename(filepath)
-        if filename.startswith('.') or filename.endswith('.download') or filename.endswith('.crdownload') or filename.endswith('.part'):
+        if filename.startswith('.') or filename.endswith(_IGNORE_SUFFIXES):
             return
 
-        # Wait a moment to ensure file write is complete (simple heuristic)
+        # Wait until the file size is stable to ensure the write is complete.
+        # Polling at 100 ms beats the old flat 1 s sleep: small finished files
+        # pass in ~200 ms while still-downloading files are waited out properly.
         if wait_for_write:
-            time.sleep(1)
+            prev_size = -1
+            stable_for = 0
+            deadline = time.time() + 30  # give up waiting and try the move anyway
+            while stable_for < 2 and time.time() < deadline:
+                try:
+                    cur_size = os.path.getsize(filepath)
+                except FileNotFoundError:
+                    return
+                if cur_size == prev_size and cur_size > 0:
+                    stable_for += 1
+                else:
+                    stable_for = 0
+                prev_size = cur_size
+                time.sleep(0.1)
 
         try:
             # Check if file still exists (it might have been moved/deleted rapidly)
@@ -94,7 +383,7 @@ class OrganizerHandler(FileSystemEventHandler):
             # For now, rely on try/except move.
 
             extension = filename.split('.')[-1] if '.' in filename else ''
-            category = get_category(extension, self.config)
+            category = self.category_for(extension)
             
             # Use the directory the file is currently IN as the base for destination
             # This ensures if we are watching ~/Desktop, it moves to ~/Desktop/Images
@@ -109,25 +398,75 @@ class OrganizerHandler(FileSystemEventHandler):
             # The requirement says "delete the duplicate file even if the name of files can be different"
             # So we strictly check if there is ANY file in dest_folder with same content.
             
-            is_dup = False
-            for existing_file in os.listdir(dest_folder):
-                existing_filepath = os.path.join(dest_folder, existing_file)
-                if os.path.isfile(existing_filepath):
-                    if is_duplicate(filepath, existing_filepath):
-                        logging.info(f"Duplicate found: {filename} is same as {existing_file}. Deleting new file.")
+            with self.get_folder_lock(dest_folder):
+                is_dup = False
+                new_st = os.stat(filepath)
+                new_size = new_st.st_size
+                new_fingerprint = None  # computed lazily, and only once
+                new_digest = None  # hash the new file lazily, and only once
+                size_index = self.get_size_index(dest_folder)
+                _stat, _basename = os.stat, os.path.basename  # bound once for the candidate loop
+                for existing_filepath in list(size_index.get(new_size, [])):
+                    try:
+                        st = _stat(existing_filepath)
+                    except FileNotFoundError:
+                        # File vanished since the index was built; drop the stale entry
+                        size_index[new_size].remove(existing_filepath)
+                        continue
+                    if st.st_size != new_size:
+                        continue
+                    # Same inode on the same device: hardlinked/cloned copy of
+                    # the existing file, a duplicate with zero bytes read
+                    if st.st_dev == new_st.st_dev and st.st_ino == new_st.st_ino:
+                        logging.info(f"Duplicate found: {filename} is the same inode as {_basename(existing_filepath)}. Deleting new link.")
                         os.remove(filepath)
                         is_dup = True
                         break
-            
-            if is_dup:
-                return
+                    # Cheap 128 KiB fingerprint first; only matches pay for a full hash
+                    if new_fingerprint is None:
+                        new_fingerprint = quick_fingerprint(filepath, new_size)
+                    if self.get_cached_fingerprint(existing_filepath, st) != new_fingerprint:
+                        continue
+                    if new_digest is None:
+                        new_digest = calculate_hash(filepath)
+                    if self.get_cached_hash(existing_filepath, st) == new_digest:
+                        # Confirm with a full byte comparison before deleting:
+                        # rules out hash collisions regardless of algorithm
+                        if not files_equal(filepath, existing_filepath):
+                            continue
+                        logging.info(f"Duplicate found: {filename} is same as {_basename(existing_filepath)}. Deleting new file.")
+                        os.remove(filepath)
+                        # Optionally keep the new name as a hardlink to the
+                        # existing content: zero bytes copied, zero rehashing
+                        # later (same inode, same size/mtime)
+                        if self.config.get("keep_duplicate_link", False):
+                            link_path = os.path.join(dest_folder, get_unique_filename(dest_folder, filename))
+                            try:
+                                os.link(existing_filepath, link_path)
+                                size_index.setdefault(new_size, []).append(link_path)
+                                logging.info(f"Linked {_basename(link_path)} to existing {_basename(existing_filepath)}.")
+                            except OSError as e:
+                                logging.warning(f"Could not hardlink duplicate name {filename}: {e}")
+                        is_dup = True
+                        break
 
-            # If not duplicate, determine final destination path (handle name collisions)
-            final_filename = get_unique_filename(dest_folder, filename)
-            final_dest_path = os.path.join(dest_folder, final_filename)
-            
-            shutil.move(filepath, final_dest_path)
-            logging.info(f"Moved {filename} to {category}/{final_filename}")
+                if is_dup:
+                    return
+
+                # If not duplicate, determine final destination path (handle name collisions)
+                final_filename = get_unique_filename(dest_folder, filename)
+                final_dest_path = os.path.join(dest_folder, final_filename)
+
+                # Source and destination are on the same filesystem in the
+                # common case, so a plain rename suffices; fall back to
+                # shutil.move's copy+unlink for cross-device moves
+                try:
+                    os.replace(filepath, final_dest_path)
+                except OSError:
+                    shutil.move(filepath, final_dest_path)
+                size_index.setdefault(new_size, []).append(final_dest_path)
+                self.schedule_archival(final_dest_path)
+                logging.info(f"Moved {filename} to {category}/{final_filename}")
 
         except Exception as e:
             logging.error(f"Error processing {filepath}: {e}")
@@ -167,85 +506,122 @@ if __name__ == "__main__":
     
     observer.start()
     
-    # Organize existing files on startup for ALL targets
+    # Organize existing files on startup for ALL targets.
+    # Hashing releases the GIL, so a thread pool genuinely parallelizes the
+    # per-file work; the per-folder locks keep moves and renames consistent.
     logging.info("Scanning existing files...")
-    for target_dir in valid_targets:
-        logging.info(f"Scanning {target_dir}...")
-        for filename in os.listdir(target_dir):
-            filepath = os.path.join(target_dir, filename)
-            if os.path.isfile(filepath):
-                 event_handler.process_file(filepath, wait_for_write=False)
+    with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as executor:
+        for target_dir in valid_targets:
+            logging.info(f"Scanning {target_dir}...")
+            with os.scandir(target_dir) as entries:
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False):
+                        executor.submit(event_handler.process_file, entry.path, wait_for_write=False)
     logging.info("Finished scanning existing files.")
 
-    # Periodic Archival
+    # Deadline-driven Archival
     if config.get("archive", {}).get("enabled", False):
         days = config["archive"].get("days", 5)
-        logging.info(f"Archival enabled: checking for files older than {days} days every 24 hours.")
-        
-        import threading
+        logging.info(f"Archival enabled: archiving files older than {days} days as they age out.")
+
+        def archive_folder(root, archive_path, files_to_archive):
+            logging.info(f"Archiving {len(files_to_archive)} files in {root}...")
+            try:
+                # Append to zip; compresslevel=1 trades a little ratio for ~3x
+                # less DEFLATE CPU, and already-compressed formats are stored raw
+                with zipfile.ZipFile(archive_path, 'a', zipfile.ZIP_DEFLATED, compresslevel=1) as zipf:
+                    for file in files_to_archive:
+                        file_path = os.path.join(root, file)
+                        ext = file.rsplit('.', 1)[-1].lower() if '.' in file else ''
+                        compress_type = zipfile.ZIP_STORED if ext in ALREADY_COMPRESSED_EXTS else zipfile.ZIP_DEFLATED
+                        # Write file to zip with just the filename (no path structure inside zip)
+                        zipf.write(file_path, file, compress_type=compress_type)
+                        logging.info(f"Archived {file}")
+
+                # Delete original files
+                for file in files_to_archive:
+                    file_path = os.path.join(root, file)
+                    os.remove(file_path)
+                    logging.info(f"Deleted original {file}")
+
+                # Folder contents changed; rebuild its size index lazily
+                event_handler.size_index.pop(root, None)
 
-        def run_archival():
-            logging.info("Starting archival process...")
-            threshold_seconds = days * 86400
-            current_time = time.time()
+            except Exception as e:
+                logging.error(f"Failed to archive in {root}: {e}")
 
+        threshold_seconds = days * 86400
+        event_handler.archive_threshold = threshold_seconds
+
+        def build_archive_heap():
+            """One-time startup walk: seed the deadline heap with existing files."""
             for target_dir in valid_targets:
                 logging.info(f"Archiving in {target_dir}...")
                 
                 # Iterate over subdirectories in Target Directory
-                for item in os.listdir(target_dir):
-                    item_path = os.path.join(target_dir, item)
-                    
-                    # Only look inside directories (e.g. Images, Documents)
-                    if os.path.isdir(item_path) and not item.startswith('.'):
-                        
-                        # Walk through all subdirectories recursively
-                        for root, dirs, files in os.walk(item_path):
-                            archive_path = os.path.join(root, "archive.zip")
-                            files_to_archive = []
-
-                            # Find candidates in the current 'root' folder
-                            for filename in files:
-                                filepath = os.path.join(root, filename)
-                                # Skip archive.zip itself and hidden files
-                                if filename == "archive.zip" or filename.startswith('.'):
-                                    continue
-                                
-                                if os.path.isfile(filepath):
-                                    try:
-                                        file_mtime = os.path.getmtime(filepath)
-                                        if (current_time - file_mtime) > threshold_seconds:
-                                            files_to_archive.append(filename)
-                                    except OSError:
-                                        continue # Skip files if there's an error accessing attributes
-                            
-                            if files_to_archive:
-                                logging.info(f"Archiving {len(files_to_archive)} files in {root}...")
-                                import zipfile
-                                try:
-                                    # Append to zip
-                                    with zipfile.ZipFile(archive_path, 'a', zipfile.ZIP_DEFLATED) as zipf:
-                                        for file in files_to_archive:
-                                            file_path = os.path.join(root, file)
-                                            # Write file to zip with just the filename (no path structure inside zip)
-                                            zipf.write(file_path, file)
-                                            logging.info(f"Archived {file}")
-                                    
-                                    # Delete original files
-                                    for file in files_to_archive:
-                                        file_path = os.path.join(root, file)
-                                        os.remove(file_path)
-                                        logging.info(f"Deleted original {file}")
-                                        
-                                except Exception as e:
-                                    logging.error(f"Failed to archive in {root}: {e}")
-
-            logging.info("Archival process finished.")
-            # Schedule next run in 24 hours
-            threading.Timer(86400, run_archival).start()
-
-        # Run immediately on startup (in a separate thread to not block observer)
-        threading.Thread(target=run_archival).start()
+                with os.scandir(target_dir) as items:
+                    subdirs = [item.path for item in items
+                               if item.is_dir(follow_symlinks=False) and not item.name.startswith('.')]
+
+                # Only look inside directories (e.g. Images, Documents)
+                for item_path in subdirs:
+                    for root, file_entries in walk_fast(item_path):
+                        for entry in file_entries:
+                            # Skip archive.zip itself (hidden entries are
+                            # already pruned by walk_fast)
+                            if entry.name == "archive.zip":
+                                continue
+                            try:
+                                event_handler.schedule_archival(entry.path, entry.stat().st_mtime)
+                            except OSError:
+                                continue # Skip files if there's an error accessing attributes
+
+        def archival_worker():
+            """Sleep until the earliest deadline, then archive everything due.
+
+            No periodic tree walk: the heap is seeded once at startup and fed
+            by process_file on every move, so a file costs O(log n) to track
+            and waking up costs O(1) when nothing is due.
+            """
+            heap = event_handler.archive_heap
+            heap_lock = event_handler.archive_heap_lock
+            while True:
+                now = time.time()
+                due = []
+                with heap_lock:
+                    while heap and heap[0][0] <= now:
+                        due.append(heapq.heappop(heap)[1])
+                    next_deadline = heap[0][0] if heap else None
+
+                if due:
+                    # Re-verify against the real mtime (the file may have been
+                    # touched since scheduling), then archive one zip per root
+                    by_root = {}
+                    for path in due:
+                        try:
+                            mtime = os.stat(path).st_mtime
+                        except OSError:
+                            continue  # already gone
+                        if (now - mtime) > threshold_seconds:
+                            by_root.setdefault(os.path.dirname(path), []).append(os.path.basename(path))
+                        else:
+                            event_handler.schedule_archival(path, mtime)
+                    # One zip per root, so parallel roots stay single-writer
+                    if by_root:
+                        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+                            for root, files_to_archive in by_root.items():
+                                executor.submit(archive_folder, root,
+                                                os.path.join(root, "archive.zip"), files_to_archive)
+
+                # Cap the sleep so deadlines scheduled in the meantime are noticed
+                if next_deadline is None:
+                    time.sleep(60)
+                else:
+                    time.sleep(min(max(next_deadline - time.time(), 0.1), 60))
+
+        # Seed the heap, then service deadlines from a single daemon thread
+        build_archive_heap()
+        threading.Thread(target=archival_worker, daemon=True).start()
 
     try:
         while True:
@@ -253,3 +629,5 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         observer.stop()
     observer.join()
+    event_handler.save_hash_cache()
+    _log_listener.stop()  # flush queued log records before exiting